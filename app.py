@@ -1,9 +1,8 @@
-from flask import Flask, request, Response
-import pandas as pd
-from io import TextIOWrapper
+from flask import Flask, Response
 
 import calculate_pay as calc
 import shift_cross_referencer as scr
+from common.handlers import make_calculate_handler, make_crossref_handler
 
 app = Flask(__name__)
 
@@ -64,79 +63,19 @@ INDEX_HTML = """
 </html>
 """
 
+# Encoded once at import so each request sends the bytes as-is
+INDEX_HTML_BYTES = INDEX_HTML.encode('utf-8')
+
 
 @app.get("/")
 def index() -> Response:
-    return Response(INDEX_HTML, mimetype="text/html; charset=utf-8")
-
-
-@app.post("/api/calculate")
-def api_calculate() -> Response:
-    if 'timesheets' not in request.files:
-        return Response("Missing file field 'timesheets'", status=400)
-
-    file = request.files['timesheets']
-    if file.filename == "":
-        return Response("Empty filename for 'timesheets'", status=400)
-
-    try:
-        # Pandas can read from file-like; ensure text mode
-        # werkzeug provides a binary stream; TextIOWrapper handles decoding
-        text_stream = TextIOWrapper(file.stream, encoding='utf-8', errors='ignore')
-        df = pd.read_csv(text_stream, usecols=calc.COLUMNS_TO_USE)
-
-        final_report = calc.calculate_payout_report_from_df(df)
-
-        # Format currency columns for display
-        final_report_disp = final_report.copy()
-        final_report_disp['TotalAmountOwed'] = final_report_disp['TotalAmountOwed'].map('${:,.2f}'.format)
-        final_report_disp['AverageOwedPerShift'] = final_report_disp['AverageOwedPerShift'].map('${:,.2f}'.format)
-
-        lines = ["--- Employee Payout Report ---", "", final_report_disp.to_string(index=False), "", "Calculation complete."]
-        html = "<pre>" + ("\n".join(lines)) + "</pre><p><a href='/'>&larr; Back</a></p>"
-        return Response(html, mimetype="text/html; charset=utf-8")
-    except Exception as exc:
-        return Response(f"Error processing file: {exc}", status=400)
-
-
-@app.post("/api/crossref")
-def api_crossref() -> Response:
-    if 'scheduled' not in request.files or 'timesheets' not in request.files:
-        return Response("Expected file fields 'scheduled' and 'timesheets'", status=400)
-
-    f_sched = request.files['scheduled']
-    f_time = request.files['timesheets']
-    if f_sched.filename == "" or f_time.filename == "":
-        return Response("One or more files have empty filenames", status=400)
-
-    try:
-        sched_stream = TextIOWrapper(f_sched.stream, encoding='utf-8', errors='ignore')
-        time_stream = TextIOWrapper(f_time.stream, encoding='utf-8', errors='ignore')
-        df_scheduled = pd.read_csv(sched_stream)
-        df_timesheets = pd.read_csv(time_stream)
-
-        missed_by_employee, missed_count = scr.find_missed_shifts_from_dfs(df_scheduled, df_timesheets)
-
-        if missed_count == 0:
-            body = "All scheduled shifts appear to have a corresponding timesheet entry."
-            html = "<pre>" + body + "</pre><p><a href='/'>&larr; Back</a></p>"
-            return Response(html, mimetype="text/html; charset=utf-8")
+    response = Response(INDEX_HTML_BYTES, mimetype="text/html; charset=utf-8")
+    response.headers['Cache-Control'] = 'public, max-age=3600'
+    return response
 
-        lines = ["--- Missed Shifts ---", ""]
-        for employee in sorted(missed_by_employee.keys()):
-            lines.append(f"Employee: {employee}")
-            for s in missed_by_employee[employee]:
-                if 'start' in s and 'end' in s:
-                    lines.append(f"  - {s['date']} — {s['location']} (Scheduled: {s['start']} - {s['end']})")
-                else:
-                    lines.append(f"  - {s['date']} — {s['location']}")
-            lines.append("-" * 30)
-        lines.append(f"Found a total of {missed_count} missed shifts across {len(missed_by_employee)} employee(s).")
 
-        html = "<pre>" + ("\n".join(lines)) + "</pre><p><a href='/'>&larr; Back</a></p>"
-        return Response(html, mimetype="text/html; charset=utf-8")
-    except Exception as exc:
-        return Response(f"Error processing files: {exc}", status=400)
+app.post("/api/calculate")(make_calculate_handler(calc))
+app.post("/api/crossref")(make_crossref_handler(scr))
 
 
 if __name__ == "__main__":
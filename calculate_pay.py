@@ -1,104 +1,119 @@
 import pandas as pd
 import numpy as np
-import os
+from collections.abc import Iterable
+from pandas.api.types import is_numeric_dtype
+
+from common.fs import find_latest_csv_by_prefix
 
 # --- Configuration ---
 # The script will now find the latest file with this prefix
 FILE_PREFIX = "Report - timesheets - "
 
 # Corresponds to Step 1: FilteredData (Locations to exclude)
-EXCLUDED_LOCATIONS = [
+EXCLUDED_LOCATIONS = frozenset({
     "Blu on the Hudson",
     "Chart House",
     "Haven",
     "Ruth's Chris"
-]
+})
 
 # Corresponds to Step 1: FilteredData (Employees to exclude)
-EXCLUDED_EMPLOYEES = [
+# Blank employee names are dropped separately in summarize_payout_chunk
+EXCLUDED_EMPLOYEES = frozenset({
     "Nick C",
     "Troy",
     "Andy",
     "Arod",
     "Danny M",
     "Jay",
-    "Totals", # Also exclude 'Totals' from aggregations
-    ""        # Exclude blank employee names
-]
+    "Totals" # Also exclude 'Totals' from aggregations
+})
 
 # Columns from the CSV we need to read
 # A: employee, E: location, O: tips, P: cost
 COLUMNS_TO_USE = ['employee', 'location', 'tips', 'cost']
 
+# Read every column as text so pandas skips type inference; currency values
+# may contain '$' and ',' and are converted in summarize_payout_chunk
+COLUMN_DTYPES = {col: str for col in COLUMNS_TO_USE}
+
+# Rows per chunk when streaming a CSV; bounds peak memory for large timesheets
+CHUNK_SIZE = 200_000
+
 # --- End Configuration ---
 
-def find_latest_csv_by_prefix(prefix):
-    """Return the most recently modified CSV whose filename starts with prefix (case-insensitive)."""
-    prefix_lower = prefix.lower()
-    candidates = []
-    for name in os.listdir('.'):
-        lower = name.lower()
-        if lower.startswith(prefix_lower) and lower.endswith('.csv'):
-            path = os.path.join('.', name)
-            candidates.append(path)
-    if not candidates:
-        raise FileNotFoundError(f"No CSV files found starting with '{prefix}'.")
-    candidates.sort(key=lambda p: os.path.getmtime(p))
-    return candidates[-1]
-
-def clean_currency(value):
-    """Removes '$' and ',' from string and converts to float."""
-    if isinstance(value, str):
-        value = value.replace('$', '').replace(',', '')
-    return pd.to_numeric(value, errors='coerce')
-
-def calculate_payout_report_from_df(df: pd.DataFrame) -> pd.DataFrame:
+def summarize_payout_chunk(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Core logic extracted to operate on an in-memory DataFrame.
-    Returns the final report DataFrame (unformatted).
+    Runs the filter and amount-owed steps on one frame (or CSV chunk).
+    Returns per-employee 'TotalAmountOwed' and 'ShiftsThatWereOwed' indexed by employee.
     """
     # --- Step 1: FilteredData ---
     # Clean whitespace from employee and location columns before filtering
-    df = df.copy()
-    df['employee'] = df['employee'].astype(str).str.strip()
-    df['location'] = df['location'].astype(str).str.strip()
+    # Categoricals make the isin filters below compare integer codes, not strings
+    df = df.assign(
+        employee=df['employee'].astype(str).str.strip().astype('category'),
+        location=df['location'].astype(str).str.strip().astype('category')
+    )
 
     # Apply the location and employee exclusion filters
     df_filtered = df[
         (~df['location'].isin(EXCLUDED_LOCATIONS)) &
         (~df['employee'].isin(EXCLUDED_EMPLOYEES)) &
+        (df['employee'] != "") &
         (df['employee'].notna())
     ].copy()
 
-    # Clean currency columns after filtering
-    df_filtered['tips'] = df_filtered['tips'].apply(clean_currency).fillna(0)
-    df_filtered['cost'] = df_filtered['cost'].apply(clean_currency).fillna(0)
-
-    # --- Step 2: DataWithBonusCol ---
-    is_flemings = df_filtered['location'] == "Fleming's Condo"
-    cost_gt_tips = df_filtered['cost'] > df_filtered['tips']
-    df_filtered['bonus'] = np.where(is_flemings & cost_gt_tips, 13.5, 0)
-
-    # --- Step 3: PreCalculated (Source Data) ---
-    df_agg_source = df_filtered[df_filtered['cost'] > df_filtered['tips']].copy()
-    df_agg_source['amount_owed'] = (
-        df_agg_source['cost'] - df_agg_source['tips'] + df_agg_source['bonus']
+    # Clean currency columns after filtering (strip '$' and ',' in one vectorized pass)
+    for col in ('tips', 'cost'):
+        if not is_numeric_dtype(df_filtered[col]):
+            df_filtered[col] = pd.to_numeric(
+                df_filtered[col].astype(str).str.replace(r'[$,]', '', regex=True),
+                errors='coerce'
+            )
+        df_filtered[col] = df_filtered[col].fillna(0)
+
+    # --- Step 2 & 3: DataWithBonusCol & PreCalculated (Source Data) ---
+    # Work on the raw arrays so the owed mask, bonus and amount owed are
+    # each computed in a single pass
+    cost = df_filtered['cost'].to_numpy(dtype=float)
+    tips = df_filtered['tips'].to_numpy(dtype=float)
+    is_flemings = (df_filtered['location'] == "Fleming's Condo").to_numpy()
+    owed_mask = cost > tips
+    # Only owed rows are kept, so the bonus needs no second cost > tips check
+    bonus = np.where(is_flemings, 13.5, 0.0)
+    amount_owed = pd.Series(cost - tips + bonus, index=df_filtered.index)[owed_mask]
+
+    partial = amount_owed.groupby(df_filtered['employee'][owed_mask], observed=True).agg(
+        TotalAmountOwed='sum',
+        ShiftsThatWereOwed='count'
     )
+    partial.index = partial.index.astype(str)
+    return partial
+
+def calculate_payout_report_from_df(df: pd.DataFrame | Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Core logic extracted to operate on an in-memory DataFrame, or an iterable
+    of DataFrame chunks (e.g. pd.read_csv(..., chunksize=CHUNK_SIZE)).
+    Returns the final report DataFrame (unformatted).
+    """
+    chunks = [df] if isinstance(df, pd.DataFrame) else df
+    partials = [summarize_payout_chunk(chunk) for chunk in chunks]
+    if not partials:
+        partials = [summarize_payout_chunk(pd.DataFrame(columns=COLUMNS_TO_USE))]
 
     # --- Step 3 & 4: PreCalculated & DataWithAvg ---
-    summary = df_agg_source.groupby('employee').agg(
-        TotalAmountOwed=('amount_owed', 'sum'),
-        ShiftsThatWereOwed=('employee', 'count')
-    ).reset_index()
+    # Combine the per-chunk sums and counts; groupby(level=0) also sorts by employee
+    summary = pd.concat(partials).groupby(level=0).sum()
+    summary['ShiftsThatWereOwed'] = summary['ShiftsThatWereOwed'].astype(int)
+    summary = summary.rename_axis('employee').reset_index()
 
     summary['AverageOwedPerShift'] = summary['TotalAmountOwed'] / summary['ShiftsThatWereOwed']
     summary['AverageOwedPerShift'] = summary['AverageOwedPerShift'].fillna(0)
-    summary = summary.sort_values(by='employee')
     summary = summary.rename(columns={'employee': 'Employee'})
 
     # --- Step 5-7: TotalRow, TotalAvg, FinalTotalRow ---
-    total_amount = df_agg_source['amount_owed'].sum()
-    total_shifts = len(df_agg_source)
+    total_amount = summary['TotalAmountOwed'].sum()
+    total_shifts = int(summary['ShiftsThatWereOwed'].sum())
     total_avg = (total_amount / total_shifts) if total_shifts > 0 else 0
 
     total_row = pd.DataFrame([
@@ -113,6 +128,11 @@ def calculate_payout_report_from_df(df: pd.DataFrame) -> pd.DataFrame:
     final_report = pd.concat([summary, total_row], ignore_index=True)
     return final_report
 
+def format_currency(values: pd.Series) -> pd.Series:
+    """Format a numeric Series as '$1,234.56' strings."""
+    fmt = '${:,.2f}'.format
+    return pd.Series([fmt(v) for v in values.to_numpy()], index=values.index)
+
 def calculate_payout_report():
     """
     Reads the latest timesheet CSV and replicates the Excel formula logic
@@ -123,8 +143,11 @@ def calculate_payout_report():
         INPUT_FILE = find_latest_csv_by_prefix(FILE_PREFIX)
         print(f"Processing latest file: {INPUT_FILE}\n")
         
-        # Load only the columns we need
-        df = pd.read_csv(INPUT_FILE, usecols=COLUMNS_TO_USE)
+        # Stream only the columns we need, chunk by chunk. Chunks are parsed
+        # lazily, so the report is built inside the try to catch parse errors.
+        with pd.read_csv(INPUT_FILE, usecols=COLUMNS_TO_USE, dtype=COLUMN_DTYPES, chunksize=CHUNK_SIZE) as reader:
+            # Delegate to the DataFrame-based implementation
+            final_report = calculate_payout_report_from_df(reader)
         
     except FileNotFoundError as e:
         print(f"Error: {e}")
@@ -138,15 +161,12 @@ def calculate_payout_report():
         print(f"An unexpected error occurred during file loading: {e}")
         return
 
-    # Delegate to the DataFrame-based implementation
-    final_report = calculate_payout_report_from_df(df)
-
     # --- Final Output ---
     print("--- Employee Payout Report ---")
     
     # Format the currency columns for printing
-    final_report['TotalAmountOwed'] = final_report['TotalAmountOwed'].map('${:,.2f}'.format)
-    final_report['AverageOwedPerShift'] = final_report['AverageOwedPerShift'].map('${:,.2f}'.format)
+    final_report['TotalAmountOwed'] = format_currency(final_report['TotalAmountOwed'])
+    final_report['AverageOwedPerShift'] = format_currency(final_report['AverageOwedPerShift'])
 
     # Print the final DataFrame to the terminal as a string
     # index=False hides the row numbers (0, 1, 2...)
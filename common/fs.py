@@ -0,0 +1,15 @@
+import os
+
+def find_latest_csv_by_prefix(prefix):
+    """Return the most recently modified CSV whose filename starts with prefix (case-insensitive)."""
+    prefix_lower = prefix.lower()
+    candidates = []
+    # One max() pass picks the newest file instead of a full sort; directories are skipped
+    with os.scandir('.') as entries:
+        for entry in entries:
+            lower = entry.name.lower()
+            if lower.startswith(prefix_lower) and lower.endswith('.csv') and entry.is_file():
+                candidates.append((entry.stat().st_mtime, entry.path))
+    if not candidates:
+        raise FileNotFoundError(f"No CSV files found starting with '{prefix}'.")
+    return max(candidates)[1]
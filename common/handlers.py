@@ -0,0 +1,108 @@
+from flask import request, Response
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+from common.report_cache import ReportCache, upload_digest
+
+
+def make_calculate_handler(calc):
+    """
+    Build the payout-report upload view around the calculate_pay module.
+    Each handler gets its own cache of rendered reports, keyed by content digest.
+    """
+    cache = ReportCache()
+
+    def api_calculate() -> Response:
+        if 'timesheets' not in request.files:
+            return Response("Missing file field 'timesheets'", status=400)
+
+        file = request.files['timesheets']
+        if file.filename == "":
+            return Response("Empty filename for 'timesheets'", status=400)
+
+        try:
+            # Repeat uploads of the same file are served from the cache
+            key = upload_digest([file.stream])
+            html = cache.get(key)
+            if html is not None:
+                return Response(html, mimetype="text/html; charset=utf-8")
+
+            # Stream the upload in chunks so memory stays bounded for large timesheets
+            with pd.read_csv(
+                file.stream,
+                usecols=calc.COLUMNS_TO_USE,
+                dtype=calc.COLUMN_DTYPES,
+                chunksize=calc.CHUNK_SIZE,
+                encoding='utf-8',
+                encoding_errors='ignore'
+            ) as reader:
+                final_report = calc.calculate_payout_report_from_df(reader)
+
+            # Format currency columns for display
+            final_report_disp = final_report.copy()
+            final_report_disp['TotalAmountOwed'] = calc.format_currency(final_report_disp['TotalAmountOwed'])
+            final_report_disp['AverageOwedPerShift'] = calc.format_currency(final_report_disp['AverageOwedPerShift'])
+
+            lines = ["--- Employee Payout Report ---", "", final_report_disp.to_string(index=False), "", "Calculation complete."]
+            html = "<pre>" + ("\n".join(lines)) + "</pre><p><a href='/'>&larr; Back</a></p>"
+            cache.put(key, html)
+            return Response(html, mimetype="text/html; charset=utf-8")
+        except Exception as exc:
+            return Response(f"Error processing file: {exc}", status=400)
+
+    return api_calculate
+
+
+def make_crossref_handler(scr):
+    """
+    Build the missed-shifts upload view around the shift_cross_referencer module.
+    Each handler gets its own cache of rendered reports, keyed by content digest.
+    """
+    cache = ReportCache()
+
+    def api_crossref() -> Response:
+        if 'scheduled' not in request.files or 'timesheets' not in request.files:
+            return Response("Expected file fields 'scheduled' and 'timesheets'", status=400)
+
+        f_sched = request.files['scheduled']
+        f_time = request.files['timesheets']
+        if f_sched.filename == "" or f_time.filename == "":
+            return Response("One or more files have empty filenames", status=400)
+
+        try:
+            # Repeat uploads of the same pair of files are served from the cache
+            key = upload_digest([f_sched.stream, f_time.stream])
+            html = cache.get(key)
+            if html is not None:
+                return Response(html, mimetype="text/html; charset=utf-8")
+
+            # Parse both uploads concurrently; the C parser releases the GIL.
+            # The two streams are separate objects, so the readers share nothing.
+            read_options = dict(dtype=scr.KEY_COLUMN_DTYPES, encoding='utf-8', encoding_errors='ignore')
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                sched_future = pool.submit(pd.read_csv, f_sched.stream, **read_options)
+                time_future = pool.submit(pd.read_csv, f_time.stream, **read_options)
+                df_scheduled = sched_future.result()
+                df_timesheets = time_future.result()
+
+            missed = scr.find_missed_shifts_df(df_scheduled, df_timesheets)
+
+            if missed.empty:
+                body = "All scheduled shifts appear to have a corresponding timesheet entry."
+                html = "<pre>" + body + "</pre><p><a href='/'>&larr; Back</a></p>"
+            else:
+                lines = ["--- Missed Shifts ---", ""]
+                lines_by_employee = scr.format_missed_shift_lines(missed)
+                for employee, shift_lines in lines_by_employee.items():
+                    lines.append(f"Employee: {employee}")
+                    lines.extend(shift_lines)
+                    lines.append("-" * 30)
+                lines.append(f"Found a total of {len(missed)} missed shifts across {len(lines_by_employee)} employee(s).")
+                html = "<pre>" + ("\n".join(lines)) + "</pre><p><a href='/'>&larr; Back</a></p>"
+
+            cache.put(key, html)
+            return Response(html, mimetype="text/html; charset=utf-8")
+        except Exception as exc:
+            return Response(f"Error processing files: {exc}", status=400)
+
+    return api_crossref
@@ -0,0 +1,53 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Number of rendered reports kept per cache
+DEFAULT_MAXSIZE = 64
+
+# Bytes read per step while hashing an upload
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def upload_digest(streams) -> bytes:
+    """
+    Return a SHA-256 digest identifying one or more uploaded files by content.
+    Each stream is hashed in fixed-size blocks and rewound, ready to be parsed.
+    """
+    h = hashlib.sha256()
+    for stream in streams:
+        file_hash = hashlib.sha256()
+        for block in iter(lambda: stream.read(HASH_BLOCK_SIZE), b''):
+            file_hash.update(block)
+        stream.seek(0)
+        # Hashing each file on its own keeps (a, bc) and (ab, c) from colliding
+        h.update(file_hash.digest())
+    return h.digest()
+
+
+class ReportCache:
+    """
+    Small thread-safe LRU of rendered reports keyed by upload digest.
+    Only the digest and the rendered output are kept, never the upload itself.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes):
+        """Return the cached report for key (marking it recently used), or None."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: bytes, value) -> None:
+        """Store value under key, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
@@ -1,20 +1,9 @@
 import pandas as pd
+import numpy as np
 import os
+from pandas.api.types import infer_dtype
 
-def find_latest_csv_by_prefix(prefix):
-    """Return the most recently modified CSV whose filename starts with prefix (case-insensitive)."""
-    prefix_lower = prefix.lower()
-    candidates = []
-    for name in os.listdir('.'):
-        lower = name.lower()
-        if lower.startswith(prefix_lower) and lower.endswith('.csv'):
-            path = os.path.join('.', name)
-            candidates.append(path)
-    if not candidates:
-        raise FileNotFoundError(f"No CSV files found starting with '{prefix}'.")
-    candidates.sort(key=lambda p: os.path.getmtime(p))
-    return candidates[-1]
-from collections import defaultdict
+from common.fs import find_latest_csv_by_prefix
 
 # --- Configuration ---
 # Optional file path overrides via environment; otherwise resolved at runtime when needed
@@ -24,13 +13,14 @@ TIMESHEET_FILE = os.environ.get("TIMESHEET_FILE")
 # Define the columns that uniquely identify a shift
 # We use Employee, Date, and Location
 KEY_COLUMNS = ['employee', 'date', 'location']
-# ---------------------
 
-def strip_whitespace(value):
-    """Helper function to remove leading/trailing whitespace from a cell."""
-    if isinstance(value, str):
-        return value.strip()
-    return value
+# Read the key columns as text so both files compare like-for-like and
+# pandas skips type inference for them
+KEY_COLUMN_DTYPES = {col: str for col in KEY_COLUMNS}
+
+# Inferred column types that the .str accessor accepts (str cells, possibly mixed with others)
+STRIPPABLE_INFERRED_TYPES = frozenset({'string', 'mixed', 'mixed-integer', 'empty'})
+# ---------------------
 
 def find_first_existing_column(df, candidates):
     """Return the first matching column from candidates (case-insensitive), or None."""
@@ -76,74 +66,99 @@ IGNORED_LOCATIONS = {
     "Fleming's Edgewater",
 }
 
-def find_missed_shifts_from_dfs(df_scheduled: pd.DataFrame, df_timesheets: pd.DataFrame):
+# Lower-cased copies of the ignore lists, built once at import
+IGNORED_EMPLOYEES_LC = frozenset(name.lower() for name in IGNORED_EMPLOYEES)
+IGNORED_LOCATIONS_LC = frozenset(loc.lower() for loc in IGNORED_LOCATIONS)
+
+def isin_case_insensitive(series, values_lower):
+    """Case-insensitive Series.isin that lower-cases each distinct value only once."""
+    codes, uniques = pd.factorize(series.astype(str))
+    matches = pd.Index(uniques).str.lower().isin(values_lower)
+    return pd.Series(matches[codes], index=series.index)
+
+def drop_ignored_rows(df):
+    """Return df without rows whose employee or location is ignored (case-insensitive)."""
+    keep = pd.Series(True, index=df.index)
+    if 'employee' in df.columns:
+        keep &= ~isin_case_insensitive(df['employee'], IGNORED_EMPLOYEES_LC)
+    if 'location' in df.columns:
+        keep &= ~isin_case_insensitive(df['location'], IGNORED_LOCATIONS_LC)
+    return df[keep]
+
+def factorize_shift_keys(df_scheduled, df_timesheets):
     """
-    Core logic extracted to operate on in-memory DataFrames.
-    Returns (missed_by_employee: dict[str, list[dict]], missed_shifts_count: int).
+    Encode each (employee, date, location) key as one integer shared by both frames.
+    Returns (scheduled_keys, worked_keys) as int64 arrays; equal keys get equal codes.
     """
-    # Normalize key columns by stripping whitespace
+    n_scheduled = len(df_scheduled)
+    keys = np.zeros(n_scheduled + len(df_timesheets), dtype=np.int64)
     for col in KEY_COLUMNS:
-        if col in df_scheduled.columns:
-            df_scheduled[col] = df_scheduled[col].apply(strip_whitespace)
-        if col in df_timesheets.columns:
-            df_timesheets[col] = df_timesheets[col].apply(strip_whitespace)
+        values = pd.concat([df_scheduled[col], df_timesheets[col]], ignore_index=True)
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        # Re-factorize the combined codes so they stay below the row count (no overflow)
+        keys, _ = pd.factorize(keys * len(uniques) + codes)
+    return keys[:n_scheduled], keys[n_scheduled:]
+
+def find_missed_shifts_df(df_scheduled: pd.DataFrame, df_timesheets: pd.DataFrame) -> pd.DataFrame:
+    """
+    Core logic extracted to operate on in-memory DataFrames.
+    Returns one row per missed shift with columns 'employee', 'date', 'location'
+    and, when the scheduled file has start/end times, 'start' and 'end'.
+    """
+    # Normalize key columns by stripping whitespace; non-str cells (which
+    # .str.strip() turns into NaN) keep their original value, and columns
+    # holding no str values at all are left untouched
+    for df in (df_scheduled, df_timesheets):
+        for col in KEY_COLUMNS:
+            if col in df.columns and infer_dtype(df[col], skipna=True) in STRIPPABLE_INFERRED_TYPES:
+                stripped = df[col].str.strip()
+                df[col] = stripped.where(stripped.notna(), df[col])
 
     # Filter out ignored employees and locations (case-insensitive)
-    ignored_lower = {name.lower() for name in IGNORED_EMPLOYEES}
-    ignored_locations_lower = {loc.lower() for loc in IGNORED_LOCATIONS}
-
-    if 'employee' in df_scheduled.columns:
-        df_scheduled = df_scheduled[
-            ~df_scheduled['employee'].astype(str).str.lower().isin(ignored_lower)
-        ]
-    if 'employee' in df_timesheets.columns:
-        df_timesheets = df_timesheets[
-            ~df_timesheets['employee'].astype(str).str.lower().isin(ignored_lower)
-        ]
-
-    if 'location' in df_scheduled.columns:
-        df_scheduled = df_scheduled[
-            ~df_scheduled['location'].astype(str).str.lower().isin(ignored_locations_lower)
-        ]
-    if 'location' in df_timesheets.columns:
-        df_timesheets = df_timesheets[
-            ~df_timesheets['location'].astype(str).str.lower().isin(ignored_locations_lower)
-        ]
+    df_scheduled = drop_ignored_rows(df_scheduled)
+    df_timesheets = drop_ignored_rows(df_timesheets)
 
     # Detect optional start/end columns on scheduled file
     start_col = find_first_existing_column(df_scheduled, SCHEDULED_START_CANDIDATES)
     end_col = find_first_existing_column(df_scheduled, SCHEDULED_END_CANDIDATES)
 
-    # Set of unique worked shifts for fast membership checks
-    worked_shifts = set(
-        zip(
-            df_timesheets[KEY_COLUMNS[0]],
-            df_timesheets[KEY_COLUMNS[1]],
-            df_timesheets[KEY_COLUMNS[2]]
-        )
-    )
-
-    missed_shifts_count = 0
-    missed_by_employee = defaultdict(list)
-
-    for _, row in df_scheduled.iterrows():
-        scheduled_key = (
-            row[KEY_COLUMNS[0]],
-            row[KEY_COLUMNS[1]],
-            row[KEY_COLUMNS[2]]
-        )
-        if scheduled_key not in worked_shifts:
-            missed_shifts_count += 1
-            entry = {
-                'date': row['date'],
-                'location': row['location'],
-            }
-            if start_col and end_col:
-                entry['start'] = row[start_col]
-                entry['end'] = row[end_col]
-            missed_by_employee[row['employee']].append(entry)
-
-    return missed_by_employee, missed_shifts_count
+    # Anti-join: keep scheduled shifts with no matching worked shift
+    scheduled_keys, worked_keys = factorize_shift_keys(df_scheduled, df_timesheets)
+    missed = df_scheduled[~np.isin(scheduled_keys, worked_keys)]
+
+    output_columns = {'employee': 'employee', 'date': 'date', 'location': 'location'}
+    if start_col and end_col:
+        output_columns[start_col] = 'start'
+        output_columns[end_col] = 'end'
+    return missed[list(output_columns)].rename(columns=output_columns)
+
+def find_missed_shifts_from_dfs(df_scheduled: pd.DataFrame, df_timesheets: pd.DataFrame):
+    """
+    Dict-based wrapper around find_missed_shifts_df.
+    Returns (missed_by_employee: dict[str, list[dict]], missed_shifts_count: int),
+    with missed_by_employee already in sorted employee order.
+    """
+    missed = find_missed_shifts_df(df_scheduled, df_timesheets)
+    entries = missed.drop(columns='employee')
+    missed_by_employee = {
+        employee: group.to_dict('records')
+        for employee, group in entries.groupby(missed['employee'], sort=True, dropna=False)
+    }
+    return missed_by_employee, len(missed)
+
+def as_text(values: pd.Series) -> pd.Series:
+    """Convert every cell with str(), so missing values render as 'nan' like an f-string would."""
+    return pd.Series(values.to_numpy(dtype=object).astype(str), index=values.index, dtype=object)
+
+def format_missed_shift_lines(missed: pd.DataFrame) -> pd.Series:
+    """
+    Render the output of find_missed_shifts_df as report lines.
+    Returns a Series indexed by employee (sorted) whose values are lists of lines.
+    """
+    lines = '  - ' + as_text(missed['date']) + ' — ' + as_text(missed['location'])
+    if 'start' in missed.columns and 'end' in missed.columns:
+        lines = lines + ' (Scheduled: ' + as_text(missed['start']) + ' - ' + as_text(missed['end']) + ')'
+    return lines.groupby(missed['employee'], sort=True, dropna=False).agg(list)
 
 def find_missed_shifts():
     """
@@ -157,26 +172,26 @@ def find_missed_shifts():
     print(f"Loading timesheets from: {timesheet_file}\n")
 
     try:
-        # Load the CSVs with on-read whitespace normalization
-        converters = {col: strip_whitespace for col in KEY_COLUMNS}
-        df_scheduled = pd.read_csv(scheduled_file, converters=converters)
-        df_timesheets = pd.read_csv(timesheet_file, converters=converters)
+        # Load the CSVs; key columns are whitespace-normalized by find_missed_shifts_df.
+        # Blank key cells are kept as '' rather than NaN, as the CLI has always shown them.
+        df_scheduled = pd.read_csv(scheduled_file, dtype=KEY_COLUMN_DTYPES)
+        df_timesheets = pd.read_csv(timesheet_file, dtype=KEY_COLUMN_DTYPES)
+        for df in (df_scheduled, df_timesheets):
+            present = [col for col in KEY_COLUMNS if col in df.columns]
+            df[present] = df[present].fillna('')
 
-        missed_by_employee, missed_shifts_count = find_missed_shifts_from_dfs(df_scheduled, df_timesheets)
+        missed = find_missed_shifts_df(df_scheduled, df_timesheets)
 
-        if missed_shifts_count == 0:
+        if missed.empty:
             print("\nAll scheduled shifts appear to have a corresponding timesheet entry.")
         else:
             print("")
-            for employee in sorted(missed_by_employee.keys()):
+            lines_by_employee = format_missed_shift_lines(missed)
+            for employee, shift_lines in lines_by_employee.items():
                 print(f"Employee: {employee}")
-                for s in missed_by_employee[employee]:
-                    if 'start' in s and 'end' in s:
-                        print(f"  - {s['date']} — {s['location']} (Scheduled: {s['start']} - {s['end']})")
-                    else:
-                        print(f"  - {s['date']} — {s['location']}")
+                print("\n".join(shift_lines))
                 print("-" * 30)
-            print(f"Found a total of {missed_shifts_count} missed shifts across {len(missed_by_employee)} employee(s).")
+            print(f"Found a total of {len(missed)} missed shifts across {len(lines_by_employee)} employee(s).")
 
     except FileNotFoundError as e:
         print(f"Error: File not found.")